@@ -0,0 +1,10 @@
+# gunicorn config for attacker_v2.
+#
+# Single worker on purpose: the active C2 subset is chosen with random.sample
+# per process, so multiple workers would answer inconsistently for the same
+# label. Concurrency comes from gevent greenlets inside the one worker.
+bind = "0.0.0.0:8080"
+workers = 1
+worker_class = "gevent"
+worker_connections = 1000
+keepalive = 5
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for attacker_v2.
+
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+The rotation thread is started here so DGA sets keep rotating when the app
+is served by gunicorn instead of the Flask dev server.
+"""
+
+from attacker_v2 import app, start_rotation
+
+start_rotation()
@@ -1,525 +1,805 @@
-#!/usr/bin/env python3
-"""
-File name: defender_v2.py
-Author: abhijithsuren
-
-- Loads a CSV dataset (configurable path) and trains a DecisionTreeClassifier.
-- Exposes a Flask web service:
-    POST /check   -> {"verdict": "DGA"|"NOT_DGA"|"UNKNOWN", "confidence": float}
-    GET  /dashboard -> HTML UI (shows recent queries and allows manual block/unblock)
-    GET  /api/queries -> JSON list of recent queries
-    POST /api/block  -> JSON {"domain": "..."} (manual block)
-    POST /api/unblock-> JSON {"domain": "..."} (manual unblock)
-- Persists logs and manual block list under /app/logs so volume mapping keeps them on the host.
-"""
-
-from flask import Flask, request, jsonify, render_template_string
-import pandas as pd
-import numpy as np
-import os
-import math
-import json
-import threading
-import time
-from datetime import datetime
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.exceptions import NotFittedError
-
-# ---------------- Configuration ----------------
-CSV_PATH = os.environ.get("DEFENDER_CSV_PATH", "/app/datasets/domains_features_numeric_with_more_tables.csv")
-# If CSV_PATH does not exist, the model will use a fallback that labels everything NOT_DGA by default.
-MODEL_NAME = "decision_tree"
-
-LOG_DIR = "/app/logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-DEFENDER_LOG = os.path.join(LOG_DIR, "defender_v2.log")
-QUERIES_FILE = os.path.join(LOG_DIR, "queries.json")
-BLOCKED_FILE = os.path.join(LOG_DIR, "blocked.json")
-MAX_RECENT = 200   # keep last 200 queries in memory for dashboard
-# -----------------------------------------------
-
-app = Flask(__name__)
-
-# In-memory structures
-recent_queries = []  # list of dicts: {domain, verdict, confidence, timestamp, source("auto"|"manual")}
-recent_lock = threading.Lock()
-
-# manual blocklist (domains that analyst manually blocks)
-# persisted to BLOCKED_FILE
-if os.path.exists(BLOCKED_FILE):
-    try:
-        with open(BLOCKED_FILE, "r") as f:
-            manual_block = set(json.load(f))
-    except Exception:
-        manual_block = set()
-else:
-    manual_block = set()
-
-# Simple logger
-def log(msg: str):
-    ts = datetime.utcnow().isoformat() + "Z"
-    line = f"[{ts}] {msg}"
-    print(line, flush=True)
-    try:
-        with open(DEFENDER_LOG, "a") as f:
-            f.write(line + "\n")
-    except Exception:
-        pass
-
-def persist_blocked():
-    try:
-        with open(BLOCKED_FILE, "w") as f:
-            json.dump(sorted(list(manual_block)), f)
-    except Exception as e:
-        log(f"ERROR: cannot persist blocked list: {e}")
-
-def persist_query(q):
-    # append to queries file
-    try:
-        if os.path.exists(QUERIES_FILE):
-            with open(QUERIES_FILE, "r+") as f:
-                try:
-                    data = json.load(f)
-                except Exception:
-                    data = []
-                data.append(q)
-                f.seek(0)
-                json.dump(data[-1000:], f)  # keep last 1000
-                f.truncate()
-        else:
-            with open(QUERIES_FILE, "w") as f:
-                json.dump([q], f)
-    except Exception as e:
-        log(f"ERROR: cannot persist query: {e}")
-
-# ---------------- Feature extraction helpers ----------------
-def shannon_entropy(s: str) -> float:
-    if not s:
-        return 0.0
-    probs = [c / len(s) for c in list(map(lambda x: s.count(x), set(s)))]
-    return -sum(p * math.log2(p) for p in probs)
-
-def extract_features_from_domain(domain: str):
-    """
-    Given a domain string like 'abc123.com' return the numeric feature vector in the
-    same order as training:
-    [length, digits, letters, unique_chars, vowels, consonants, digit_ratio, entropy]
-    (NOTE: We intentionally do NOT require tld_id here to keep the pipeline simple. Maybe we can implement that on v3)
-    """
-    domain = domain.strip().lower()
-    if "." in domain:
-        name = domain.rsplit(".", 1)[0]
-        tld = domain.rsplit(".", 1)[1]
-    else:
-        name = domain
-        tld = ""
-    length = len(name)
-    digits = sum(c.isdigit() for c in name)
-    letters = sum(c.isalpha() for c in name)
-    vowels = sum(c in "aeiou" for c in name)
-    consonants = letters - vowels
-    unique_chars = len(set(name))
-    digit_ratio = (digits / length) if length > 0 else 0.0
-    entropy = shannon_entropy(name)
-    return [length, digits, letters, unique_chars, vowels, consonants, digit_ratio, entropy]
-
-# ---------------- Model loading / training ----------------
-model = None
-model_lock = threading.Lock()
-
-def load_and_train(csv_path: str):
-    global model
-    if not os.path.exists(csv_path):
-        log(f"Training CSV not found at {csv_path}. Defender_v2 will run with fallback classifier (NOT_DGA default).")
-        model = None
-        return
-    try:
-        log(f"Loading training CSV from {csv_path} ...")
-        df = pd.read_csv(csv_path)
-        # Expect columns similar to: length,digits,letters,unique_chars,vowels,consonants,digit_ratio,entropy,tld_id,label
-        # We will drop 'label' to get X, and drop tld_id if present (to avoid needing original TLD encoder)
-        if "label" not in df.columns:
-            raise ValueError("CSV must contain a 'label' column with target labels (e.g., DGA/NOT_DGA).")
-        X = df.drop(columns=["label"])
-        # If tld_id present, drop it to keep features numeric and consistent
-        if "tld_id" in X.columns:
-            X = X.drop(columns=["tld_id"])
-        y = df["label"]
-        # Convert to numeric matrix if needed
-        X_numeric = X.select_dtypes(include=[np.number]).fillna(0.0)
-        # Train Decision Tree
-        clf = DecisionTreeClassifier(random_state=42)
-        clf.fit(X_numeric.values, y.values)
-        with model_lock:
-            model = (clf, X_numeric.columns.tolist())  # save columns order
-        log("Model trained successfully.")
-    except Exception as e:
-        log(f"ERROR training model: {e}")
-        model = None
-
-# Load model at startup (non-blocking)
-load_and_train(CSV_PATH)
-
-# Optional separate thread to retrain periodically if you want (not active by default)
-def retrain_periodically(interval_seconds=0):
-    if interval_seconds <= 0:
-        return
-    while True:
-        time.sleep(interval_seconds)
-        load_and_train(CSV_PATH)
-
-# ---------------- Decision / API logic ----------------
-def classify_domain(domain: str):
-    """
-    Returns tuple (verdict, confidence, detail_source)
-    - verdict: "DGA" or "NOT_DGA" or "UNKNOWN"
-    - confidence: float between 0..1 (or 0.0 if not available)
-    - detail_source: string (e.g., 'model','manual','fallback')
-    """
-    domain = domain.strip().lower()
-    
-    # Manual blocklist has highest priority
-    if domain in manual_block:
-        return ("DGA", 1.0, "manual_block")
-
-    # Feature extraction
-    feats = extract_features_from_domain(domain)
-    X = np.array(feats).reshape(1, -1)
-
-    # If model available, use it
-    with model_lock:
-        if model is None:
-            # fallback behavior: treat as NOT_DGA (safe for lab), but mark as fallback
-            return ("NOT_DGA", 0.0, "fallback_no_model")
-        clf, feature_cols = model
-
-    try:
-        # Predict class
-        pred = clf.predict(X)[0]
-
-        # Map numeric labels to strings (0 -> NOT_DGA, 1 -> DGA)
-        if isinstance(pred, (int, float, np.integer, np.floating)):
-            verdict = "DGA" if int(pred) == 1 else "NOT_DGA"
-        else:
-            verdict = str(pred).upper()  # fallback if label is string
-
-        # Calculate confidence if probability is available
-        confidence = 0.0
-        try:
-            proba = clf.predict_proba(X)
-            classes = clf.classes_
-            class_index = list(classes).index(pred)
-            confidence = float(proba[0][class_index])
-        except Exception:
-            confidence = 0.0
-
-        return (verdict, confidence, "model")
-
-    except Exception as e:
-        # If prediction fails for any reason, fallback
-        log(f"Model prediction error for domain {domain}: {e}")
-        return ("UNKNOWN", 0.0, "error")
-
-# ---------------- Flask endpoints ----------------
-@app.route("/check", methods=["POST"])
-def api_check():
-    """
-    Victim_v2 sends JSON: {"domain": "example.com"}
-    Responds JSON: {"verdict":"DGA"|"NOT_DGA"|"UNKNOWN", "confidence": float, "source": "..."}
-    """
-    data = request.get_json(silent=True)
-    if not data or "domain" not in data:
-        return jsonify({"error": "missing 'domain' in JSON"}), 400
-    domain = str(data["domain"]).strip()
-    ts = datetime.utcnow().isoformat() + "Z"
-
-    # classify
-    verdict, confidence, source = classify_domain(domain)
-
-    # If source == "fallback_no_model" treat as NOT_DGA by default; if manual_block handled earlier.
-    record = {
-        "domain": domain,
-        "verdict": verdict,
-        "confidence": round(float(confidence), 4),
-        "source": source,
-        "timestamp": ts
-    }
-
-    # save to recent list and persist
-    with recent_lock:
-        recent_queries.append(record)
-        if len(recent_queries) > MAX_RECENT:
-            recent_queries.pop(0)
-    persist_query(record)
-    log(f"CHECK: {domain} => {verdict} (conf={confidence:.3f}) src={source}")
-
-    # Return verdict
-    return jsonify({"verdict": verdict, "confidence": round(float(confidence), 4), "source": source})
-
-@app.route("/api/queries", methods=["GET"])
-def api_queries():
-    with recent_lock:
-        # return recent queries newest-first
-        return jsonify(list(reversed(recent_queries)))
-
-@app.route("/api/block", methods=["POST"])
-def api_block():
-    data = request.get_json(silent=True)
-    if not data or "domain" not in data:
-        return jsonify({"error": "missing 'domain' in JSON"}), 400
-    domain = str(data["domain"]).strip().lower()
-    manual_block.add(domain)
-    persist_blocked()
-    log(f"MANUAL BLOCK: {domain}")
-    return jsonify({"status": "ok", "domain": domain})
-
-@app.route("/api/unblock", methods=["POST"])
-def api_unblock():
-    data = request.get_json(silent=True)
-    if not data or "domain" not in data:
-        return jsonify({"error": "missing 'domain' in JSON"}), 400
-    domain = str(data["domain"]).strip().lower()
-    if domain in manual_block:
-        manual_block.remove(domain)
-        persist_blocked()
-        log(f"MANUAL UNBLOCK: {domain}")
-        return jsonify({"status": "ok", "domain": domain})
-    else:
-        return jsonify({"status": "not_found", "domain": domain}), 404
-
-# Simple health endpoint
-@app.route("/health", methods=["GET"])
-def health():
-    return jsonify({"status": "ok", "model_loaded": model is not None})
-
-# ---------------- Simple web dashboard (HTML + JS) ----------------
-DASH_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8">
-  <title>Defender SOC Dashboard</title>
-  <style>
-    body {
-      background: url("/static/bg.png") no-repeat center center fixed;
-      background-size: cover;
-      font-family: Arial, sans-serif;
-      color: #fff;
-    }
-
-    /* Overlay to darken the background slightly */
-    body::before {
-      content: "";
-      position: fixed;
-      top: 0; left: 0; right: 0; bottom: 0;
-      background: rgba(0, 0, 0, 0.034); /* 75% dark overlay */
-      z-index: -1;
-    }
-
-
-    h1 {
-      font-size: 20px;
-      color: #fff;  /* bright white headings */
-    }
-
-    table {
-      border-collapse: collapse;
-      width: 100%;
-      margin-top: 12px;
-      background: rgba(197, 190, 190, 0);       /* dark gray table bg */
-      border-radius: 8px;
-      overflow: hidden;
-      box-shadow: 0 2px 8px rgba(0,0,0,0.6);
-    }
-
-    th, td {
-      /*border: 0px solid #ffffff;    subtle borders */
-      border: 4px solid #ffffff;
-      padding: 10px;
-      text-align: left;
-    }
-
-    th {
-      background: #ffffff;
-      color: #000000;
-      font-weight: 600;
-    }
-
-    .dga {
-      background-color:#8c29a0;  /* dark red background */
-      color: #ffffff;             /* neon red text */
-      
-    }
-
-    tr.notdga {
-      background-color: #289198;  /* dark green background */
-      color:   #ffffff;             /* neon green text */
-    }
-
-    .controls {
-      margin-top: 12px;
-      background: #ffffff;
-      padding: 12px;
-      border-radius: 8px;
-      box-shadow: 0 1px 6px rgba(0,0,0,0.4);
-    }
-
-    input[type="text"] {
-      padding: 8px;
-      background: #ffffff;
-      border: 2px solid #c433db;
-      border-radius: 10px;
-      color: #000000;
-    }
-
-    button {
-      padding: 8px 14px;
-      margin-right: 6px;
-      background: #c433db;       /* purple? idk */
-      border: none;
-      border-radius: 7px;
-      color: white;
-      font-weight: 600;
-      cursor: pointer;
-      transition: background 0.3s;
-    }
-
-    button:hover {
-      background: #ff0088;       /* lighter blue hover */
-    }
-
-    #status {
-      margin-left: 8px;
-      color: #000000;
-    }
-
-  </style>
-</head>
-<body>
-  <h1>Defender SOC Dashboard</h1>
-  <div>
-    <button onclick="refresh()">Refresh</button>
-    <span id="status">Loading...</span>
-  </div>
-
-  <div class="controls">
-    <input type="text" id="manualDomain" placeholder="domain.to.block">
-    <button onclick="manualBlock()">Block</button>
-    <button onclick="manualUnblock()">Unblock</button>
-  </div>
-
-  <table id="queriesTable">
-    <thead>
-      <tr><th>Time (UTC)</th><th>Domain</th><th>Verdict</th><th>Confidence</th><th>Source</th><th>Action</th></tr>
-    </thead>
-    <tbody></tbody>
-  </table>
-
-<script>
-async function api(path, method='GET', body=null){
-  const res = await fetch(path, {
-    method: method,
-    headers: {'Content-Type': 'application/json'},
-    body: body ? JSON.stringify(body) : null
-  });
-  return res.json();
-}
-
-
-
-async function refresh(){
-  document.getElementById('status').innerText = "Refreshing..."
-  try {
-    const data = await api('/api/queries');
-    const tbody = document.querySelector('#queriesTable tbody');
-    tbody.innerHTML = '';
-
-    for (let i = 0; i < data.length; i++) {
-      const q = data[i];
-      const tr = document.createElement('tr');
-      tr.className = q.verdict === 'DGA' ? 'dga' : (q.verdict === 'NOT_DGA' ? 'notdga' : '');
-
-      // Add the basic row cells
-      tr.innerHTML = `
-        <td>${q.timestamp}</td>
-        <td>${q.domain}</td>
-        <td>${q.verdict}</td>
-        <td>${q.confidence}</td>
-        <td>${q.source}</td>
-      `;
-
-      // Create Action button cell
-      const actionTd = document.createElement('td');
-      if (q.verdict.toUpperCase() === 'DGA') {
-        actionTd.innerHTML = `<button onclick="unblockDomain('${q.domain}')">Unblock</button>`;
-      } else {
-        actionTd.innerHTML = `<button onclick="blockDomain('${q.domain}')">Block</button>`;
-      }
-
-      // Add the action button cell to the row
-      tr.appendChild(actionTd);
-
-      // Add the row to the table body
-      tbody.appendChild(tr);
-    }
-
-    document.getElementById('status').innerText = "Updated " + new Date().toLocaleTimeString();
-  } catch (e) {
-    document.getElementById('status').innerText = "Error refreshing";
-    console.error(e);
-  }
-}
-
-async function blockDomain(domain){
-  await api('/api/block','POST',{domain:domain});
-  await refresh();
-}
-
-async function unblockDomain(domain){
-  await api('/api/unblock','POST',{domain:domain});
-  await refresh();
-}
-
-async function manualBlock(){
-  const input = document.getElementById('manualDomain');
-  const domain = input.value.trim();
-  if (!domain) return alert('Enter a domain');
-  await api('/api/block','POST',{domain:domain});
-  input.value = '';   // ✅ clear input
-  await refresh();
-}
-
-async function manualUnblock(){
-  const input = document.getElementById('manualDomain');
-  const domain = input.value.trim();
-  if (!domain) return alert('Enter a domain');
-  await api('/api/unblock','POST',{domain:domain});
-  input.value = '';   // ✅ clear input
-  await refresh();
-}
-
-// poll every 2 seconds
-refresh();
-setInterval(refresh, 2000);
-</script>
-</body>
-</html>
-"""
-
-@app.route("/")
-def dashboard():
-    return render_template_string(DASH_HTML)
-
-# ---------------- Startup ----------------
-if __name__ == "__main__":
-    log("Defender_v2 starting up...")
-    # try to train model now if not already
-    load_and_train(CSV_PATH)
-    # Ensure persisted blocked file exists
-    persist_blocked()
-    # Ensure queries file exists
-    if not os.path.exists(QUERIES_FILE):
-        with open(QUERIES_FILE, "w") as f:
-            json.dump([], f)
-    # start Flask
-    app.run(host="0.0.0.0", port=5000, debug=False)
+#!/usr/bin/env python3
+"""
+File name: defender_v2.py
+Author: abhijithsuren
+
+- Loads a CSV dataset (configurable path) and trains a DecisionTreeClassifier.
+- Exposes a Flask web service:
+    POST /check   -> {"verdict": "DGA"|"NOT_DGA"|"UNKNOWN", "confidence": float}
+    GET  /dashboard -> HTML UI (shows recent queries and allows manual block/unblock)
+    GET  /api/queries -> JSON list of recent queries
+    POST /api/block  -> JSON {"domain": "..."} (manual block)
+    POST /api/unblock-> JSON {"domain": "..."} (manual unblock)
+- Persists logs and manual block list under /app/logs so volume mapping keeps them on the host.
+"""
+
+from flask import Flask, Response, request, render_template_string
+import numpy as np
+import functools
+import hashlib
+import os
+import math
+import json
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.exceptions import NotFittedError
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+# ---------------- Configuration ----------------
+CSV_PATH = os.environ.get("DEFENDER_CSV_PATH", "/app/datasets/domains_features_numeric_with_more_tables.csv")
+# If CSV_PATH does not exist, the model will use a fallback that labels everything NOT_DGA by default.
+MODEL_NAME = "decision_tree"
+
+LOG_DIR = "/app/logs"
+os.makedirs(LOG_DIR, exist_ok=True)
+DEFENDER_LOG = os.path.join(LOG_DIR, "defender_v2.log")
+QUERIES_JSONL = os.path.join(LOG_DIR, "queries.jsonl")
+BLOCKED_FILE = os.path.join(LOG_DIR, "blocked.json")
+MAX_RECENT = 200   # keep last 200 queries in memory for dashboard
+# -----------------------------------------------
+
+app = Flask(__name__)
+
+# JSON helpers: orjson (Rust, SIMD-accelerated) when available, stdlib json
+# otherwise. All API endpoints serialize through these instead of jsonify.
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _json_response(obj, status=200):
+    return Response(_dumps(obj), status=status, mimetype="application/json")
+
+def _get_json(req):
+    # orjson-backed equivalent of request.get_json(silent=True)
+    try:
+        return _loads(req.get_data())
+    except Exception:
+        return None
+
+# In-memory structures
+# deque(maxlen=...) gives O(1) append with automatic eviction of the oldest
+# entry, vs. list.pop(0) shifting every element.
+recent_queries = deque(maxlen=MAX_RECENT)  # dicts: {domain, verdict, confidence, timestamp, source("auto"|"manual")}
+recent_lock = threading.Lock()
+# serialized /api/queries bytes, invalidated on every append: all dashboard
+# pollers between two /check calls share one serialization
+_queries_cache = [None]
+
+# manual blocklist (domains that analyst manually blocks)
+# persisted to BLOCKED_FILE
+if os.path.exists(BLOCKED_FILE):
+    try:
+        with open(BLOCKED_FILE, "r") as f:
+            manual_block = set(json.load(f))
+    except Exception:
+        manual_block = set()
+else:
+    manual_block = set()
+
+# Two-tier blocklist lookup: a 32 KiB Bloom filter answers the common
+# "not blocked" case with two bit tests; only a maybe-hit falls through to
+# the authoritative manual_block set. No false negatives by construction.
+_BLOOM_BYTES = 32 * 1024
+_BLOOM_BITS = _BLOOM_BYTES * 8
+_block_bloom = bytearray(_BLOOM_BYTES)
+
+def _bloom_positions(domain: str):
+    digest = hashlib.blake2b(domain.encode(), digest_size=16).digest()
+    return (int.from_bytes(digest[:8], "little") % _BLOOM_BITS,
+            int.from_bytes(digest[8:], "little") % _BLOOM_BITS)
+
+def _bloom_add(domain: str):
+    for pos in _bloom_positions(domain):
+        _block_bloom[pos >> 3] |= 1 << (pos & 7)
+
+def _bloom_maybe(domain: str) -> bool:
+    for pos in _bloom_positions(domain):
+        if not _block_bloom[pos >> 3] & (1 << (pos & 7)):
+            return False
+    return True
+
+def _bloom_rebuild():
+    # Bloom filters cannot delete; rebuild from the set after an unblock
+    global _block_bloom
+    fresh = bytearray(_BLOOM_BYTES)
+    for blocked in manual_block:
+        digest = hashlib.blake2b(blocked.encode(), digest_size=16).digest()
+        for pos in (int.from_bytes(digest[:8], "little") % _BLOOM_BITS,
+                    int.from_bytes(digest[8:], "little") % _BLOOM_BITS):
+            fresh[pos >> 3] |= 1 << (pos & 7)
+    _block_bloom = fresh
+
+for _blocked in manual_block:
+    _bloom_add(_blocked)
+
+def is_manually_blocked(domain: str) -> bool:
+    return _bloom_maybe(domain) and domain in manual_block
+
+# Cheap UTC timestamp: one C-level strftime call, no datetime object or
+# intermediate isoformat strings on the request path.
+def _iso_now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+# Simple logger
+def log(msg: str):
+    line = f"[{_iso_now()}] {msg}"
+    print(line, flush=True)
+    try:
+        with open(DEFENDER_LOG, "a") as f:
+            f.write(line + "\n")
+    except Exception:
+        pass
+
+def persist_blocked():
+    try:
+        with open(BLOCKED_FILE, "wb") as f:
+            f.write(_dumps(sorted(manual_block)))
+    except Exception as e:
+        log(f"ERROR: cannot persist blocked list: {e}")
+
+# Query persistence: an append-only JSONL log written by a dedicated thread.
+# Request handlers only enqueue (O(1)); the writer drains the queue in batches
+# so each flush covers up to 64 records instead of rewriting a whole JSON file
+# per request.
+_persist_queue = queue.Queue(maxsize=10000)
+
+def _persist_writer_loop():
+    try:
+        f = open(QUERIES_JSONL, "ab")
+    except Exception as e:
+        log(f"ERROR: cannot open queries log {QUERIES_JSONL}: {e}")
+        return
+    while True:
+        buf = [_persist_queue.get()]
+        while len(buf) < 64:
+            try:
+                buf.append(_persist_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            f.write(b"\n".join(_dumps(x) for x in buf) + b"\n")
+            f.flush()
+        except Exception as e:
+            log(f"ERROR: cannot persist queries: {e}")
+
+threading.Thread(target=_persist_writer_loop, daemon=True).start()
+
+def persist_query(q):
+    # enqueue for the background writer; drop (with a log line) rather than
+    # block the request path if the queue is ever full
+    try:
+        _persist_queue.put_nowait(q)
+    except queue.Full:
+        log("WARN: persist queue full, dropping query record")
+
+# ---------------- Feature extraction helpers ----------------
+# Vowel bytes ('a','e','i','o','u') used to index the byte histogram below.
+_VOWEL_BYTES = np.array([97, 101, 105, 111, 117], dtype=np.intp)
+
+# c*log2(c) for c in 0..255, so entropy reduces to table lookups plus one
+# log2 via the identity H = log2(n) - (sum c*log2(c)) / n.
+_CLOG2 = np.zeros(256, dtype=np.float32)
+_CLOG2[1:] = np.arange(1, 256, dtype=np.float32) * np.log2(np.arange(1, 256, dtype=np.float32))
+
+def shannon_entropy(s: str) -> float:
+    if not s:
+        return 0.0
+    arr = np.frombuffer(s.encode("ascii", "ignore"), dtype=np.uint8)
+    counts = np.bincount(arr)
+    p = counts[counts > 0] / arr.size
+    return float(-(p * np.log2(p)).sum())
+
+def _featurize(arr):
+    """
+    Single-kernel featurizer over a uint8 name buffer. One np.bincount
+    histogram pass yields every count-based feature (digit/letter/vowel
+    counts are range/fancy slices of the histogram) plus the entropy, so
+    the buffer is scanned once instead of once per feature.
+    """
+    n = int(arr.size)
+    if n == 0:
+        return [0, 0, 0, 0, 0, 0, 0.0, 0.0]
+    counts = np.bincount(arr, minlength=128)
+    digits = int(counts[48:58].sum())        # '0'..'9'
+    letters = int(counts[97:123].sum())      # 'a'..'z' (name is lowercased)
+    vowels = int(counts[_VOWEL_BYTES].sum())
+    consonants = letters - vowels
+    unique_chars = int(np.count_nonzero(counts))
+    if n < 256:
+        # table-driven: N lookups + one log2 instead of N log2 calls
+        entropy = math.log2(n) - float(_CLOG2[counts].sum()) / n
+    else:
+        # counts can exceed the table for absurdly long names; compute directly
+        p = counts[counts > 0] / n
+        entropy = float(-(p * np.log2(p)).sum())
+    return [n, digits, letters, unique_chars, vowels, consonants, digits / n, entropy]
+
+def extract_features_from_domain(domain: str):
+    """
+    Given a domain string like 'abc123.com' return the numeric feature vector in the
+    same order as training:
+    [length, digits, letters, unique_chars, vowels, consonants, digit_ratio, entropy]
+    (NOTE: We intentionally do NOT require tld_id here to keep the pipeline simple. Maybe we can implement that on v3)
+    """
+    domain = domain.strip().lower()
+    if "." in domain:
+        name = domain.rsplit(".", 1)[0]
+        tld = domain.rsplit(".", 1)[1]
+    else:
+        name = domain
+        tld = ""
+    arr = np.frombuffer(name.encode("ascii", "ignore"), dtype=np.uint8)
+    return _featurize(arr)
+
+# ---------------- Model loading / training ----------------
+model = None
+model_lock = threading.Lock()
+
+def _compile_tree(clf):
+    """
+    Extract the fitted DecisionTreeClassifier into flat NumPy arrays:
+    (feature, threshold, children_left, children_right, leaf_probabilities).
+    Walking these arrays avoids the validation + dispatch cost sklearn pays
+    on every predict/predict_proba call, which dominates for tiny batches.
+    """
+    tree = clf.tree_
+    value = tree.value[:, 0, :]
+    prob = (value / value.sum(axis=1, keepdims=True)).astype(np.float32)
+    return (tree.feature.astype(np.int32),
+            tree.threshold.astype(np.float32),
+            tree.children_left.astype(np.int32),
+            tree.children_right.astype(np.int32),
+            prob)
+
+def _codegen_tree(tree_arrays):
+    """
+    Specialize the fitted tree into generated Python source: one nested
+    if/else per internal node, returning the leaf index. Compiling this once
+    turns every prediction into straight-line comparisons against literal
+    thresholds - no array indirection per node. Returns None if the tree is
+    too deep to emit (callers then fall back to the array walk).
+    """
+    feat, thr, left, right, prob = tree_arrays
+    lines = ["def _tree_leaf(x):"]
+
+    def emit(node, indent):
+        pad = "    " * indent
+        if left[node] == -1:
+            lines.append(f"{pad}return {node}")
+        else:
+            lines.append(f"{pad}if x[{feat[node]}] <= {float(thr[node])!r}:")
+            emit(left[node], indent + 1)
+            lines.append(f"{pad}else:")
+            emit(right[node], indent + 1)
+
+    try:
+        emit(0, 1)
+        namespace = {}
+        exec(compile("\n".join(lines), "<specialized_tree>", "exec"), namespace)
+        return namespace["_tree_leaf"]
+    except (RecursionError, SyntaxError, IndentationError) as e:
+        log(f"Tree specialization skipped ({e}); using array walk.")
+        return None
+
+def _predict_tree(X, tree_arrays):
+    """Walk the flattened tree for each row of X; returns an (N, n_classes) probability matrix."""
+    feat, thr, left, right, prob = tree_arrays
+    out = np.empty((X.shape[0], prob.shape[1]), dtype=np.float32)
+    for i in range(X.shape[0]):
+        node = 0
+        while left[node] != -1:
+            node = left[node] if X[i, feat[node]] <= thr[node] else right[node]
+        out[i] = prob[node]
+    return out
+
+def load_and_train(csv_path: str):
+    global model
+    if not os.path.exists(csv_path):
+        log(f"Training CSV not found at {csv_path}. Defender_v2 will run with fallback classifier (NOT_DGA default).")
+        model = None
+        return
+    try:
+        log(f"Loading training CSV from {csv_path} ...")
+        # Expect columns similar to: length,digits,letters,unique_chars,vowels,consonants,digit_ratio,entropy,tld_id,label
+        # genfromtxt with per-column dtype inference keeps startup free of the
+        # pandas import (~hundreds of ms) and its extra copies of the data.
+        data = np.genfromtxt(csv_path, delimiter=",", names=True, dtype=None, encoding="utf-8")
+        if data.dtype.names is None or "label" not in data.dtype.names:
+            raise ValueError("CSV must contain a 'label' column with target labels (e.g., DGA/NOT_DGA).")
+        # Drop 'label' (target) and 'tld_id' if present (avoids needing the
+        # original TLD encoder); keep numeric feature columns in file order.
+        # float32 halves memory traffic and matches the inference dtype.
+        feature_cols = [n for n in data.dtype.names
+                        if n not in ("label", "tld_id")
+                        and np.issubdtype(data[n].dtype, np.number)]
+        X_numeric = np.nan_to_num(
+            np.column_stack([data[n].astype(np.float32) for n in feature_cols]))
+        y = data["label"]
+        # Train Decision Tree
+        clf = DecisionTreeClassifier(random_state=42)
+        clf.fit(X_numeric, y)
+        # Flatten the fitted tree into plain arrays so prediction can walk it
+        # directly without sklearn's per-call validation/dispatch overhead.
+        tree_arrays = _compile_tree(clf)
+        leaf_fn = _codegen_tree(tree_arrays)
+        with model_lock:
+            model = (clf, feature_cols, tree_arrays, leaf_fn)  # save columns order
+        _classify_core.cache_clear()  # cached verdicts belong to the old tree
+        log("Model trained successfully.")
+    except Exception as e:
+        log(f"ERROR training model: {e}")
+        model = None
+
+# Optional separate thread to retrain periodically if you want (not active by default)
+def retrain_periodically(interval_seconds=0):
+    if interval_seconds <= 0:
+        return
+    while True:
+        time.sleep(interval_seconds)
+        load_and_train(CSV_PATH)
+
+# ---------------- Decision / API logic ----------------
+def _verdict_from_class(cls) -> str:
+    # Map numeric labels to strings (0 -> NOT_DGA, 1 -> DGA)
+    if isinstance(cls, (int, float, np.integer, np.floating)):
+        return "DGA" if int(cls) == 1 else "NOT_DGA"
+    return str(cls).upper()  # fallback if label is string
+
+def _classify_batch(X):
+    """
+    Run the model over an (N, 8) feature matrix in one shot.
+    Returns (verdicts, confidences, source) where verdicts/confidences are
+    parallel lists of length N. One predict_proba call covers both the class
+    (argmax per row) and its confidence, so there is a single tree traversal
+    per domain instead of predict + predict_proba.
+    """
+    n = X.shape[0]
+    with model_lock:
+        mdl = model
+    if mdl is None:
+        # fallback behavior: treat as NOT_DGA (safe for lab), but mark as fallback
+        return (["NOT_DGA"] * n, [0.0] * n, "fallback_no_model")
+    clf, feature_cols, tree_arrays, leaf_fn = mdl
+    if leaf_fn is not None:
+        prob = tree_arrays[4]
+        proba = np.empty((n, prob.shape[1]), dtype=np.float32)
+        for i in range(n):
+            proba[i] = prob[leaf_fn(X[i])]
+    else:
+        proba = _predict_tree(X, tree_arrays)
+    pred_idx = proba.argmax(axis=1)
+    confidences = proba[np.arange(n), pred_idx].tolist()
+    verdicts = [_verdict_from_class(c) for c in clf.classes_[pred_idx]]
+    return (verdicts, confidences, "model")
+
+# Per-thread preallocated (1, 8) float32 input row: single-domain inference
+# writes features in place instead of allocating a fresh array per request.
+_tls = threading.local()
+
+def _feature_buf():
+    buf = getattr(_tls, "buf", None)
+    if buf is None:
+        buf = np.empty((1, 8), dtype=np.float32)
+        _tls.buf = buf
+    return buf
+
+@functools.lru_cache(maxsize=4096)
+def _classify_core(domain: str):
+    """
+    Model-path classification for a single (lowercased) domain. Cached so
+    repeat queries (C2 beaconing, retries, dashboard refreshes) skip feature
+    extraction and the tree walk; load_and_train clears the cache whenever a
+    new tree is published. The manual blocklist is deliberately checked
+    before this cache so analyst decisions stay authoritative.
+    """
+    X = _feature_buf()
+    X[0, :] = extract_features_from_domain(domain)
+    verdicts, confidences, source = _classify_batch(X)
+    return (verdicts[0], float(confidences[0]), source)
+
+def classify_domain(domain: str):
+    """
+    Returns tuple (verdict, confidence, detail_source)
+    - verdict: "DGA" or "NOT_DGA" or "UNKNOWN"
+    - confidence: float between 0..1 (or 0.0 if not available)
+    - detail_source: string (e.g., 'model','manual','fallback')
+    """
+    domain = domain.strip().lower()
+
+    # Manual blocklist has highest priority
+    if is_manually_blocked(domain):
+        return ("DGA", 1.0, "manual_block")
+
+    try:
+        return _classify_core(domain)
+    except Exception as e:
+        # If prediction fails for any reason, fallback
+        log(f"Model prediction error for domain {domain}: {e}")
+        return ("UNKNOWN", 0.0, "error")
+
+# Load model at startup (after the classification helpers exist, since
+# load_and_train clears the verdict cache)
+load_and_train(CSV_PATH)
+
+# ---------------- Flask endpoints ----------------
+@app.route("/check", methods=["POST"])
+def api_check():
+    """
+    Victim_v2 sends JSON: {"domain": "example.com"}
+    Responds JSON: {"verdict":"DGA"|"NOT_DGA"|"UNKNOWN", "confidence": float, "source": "..."}
+    """
+    data = _get_json(request)
+    if not isinstance(data, dict) or "domain" not in data:
+        return _json_response({"error": "missing 'domain' in JSON"}, status=400)
+    domain = str(data["domain"]).strip()
+    ts = _iso_now()
+
+    # classify
+    verdict, confidence, source = classify_domain(domain)
+
+    # If source == "fallback_no_model" treat as NOT_DGA by default; if manual_block handled earlier.
+    record = {
+        "domain": domain,
+        "verdict": verdict,
+        "confidence": round(float(confidence), 4),
+        "source": source,
+        "timestamp": ts
+    }
+
+    # save to recent list and persist
+    with recent_lock:
+        recent_queries.append(record)
+        _queries_cache[0] = None
+    persist_query(record)
+    log(f"CHECK: {domain} => {verdict} (conf={confidence:.3f}) src={source}")
+
+    # Return verdict
+    return _json_response({"verdict": verdict, "confidence": round(float(confidence), 4), "source": source})
+
+@app.route("/check_batch", methods=["POST"])
+def api_check_batch():
+    """
+    Batched variant of /check. Victim_v2 sends JSON: {"domains": ["a.com", ...]}
+    Responds JSON: {"verdicts": {domain: verdict, ...}, "results": [record, ...]}
+    Features for all non-manually-blocked domains are stacked into one
+    (N, 8) matrix and classified with a single predict_proba call.
+    """
+    data = _get_json(request)
+    if not isinstance(data, dict) or not isinstance(data.get("domains"), list):
+        return _json_response({"error": "missing 'domains' list in JSON"}, status=400)
+    domains = [str(d).strip().lower() for d in data["domains"]]
+    ts = _iso_now()
+
+    verdicts = [None] * len(domains)
+    confidences = [0.0] * len(domains)
+    sources = [None] * len(domains)
+
+    # Manual blocklist has highest priority; only the rest go to the model
+    model_idx = []
+    for i, domain in enumerate(domains):
+        if is_manually_blocked(domain):
+            verdicts[i], confidences[i], sources[i] = ("DGA", 1.0, "manual_block")
+        else:
+            model_idx.append(i)
+
+    if model_idx:
+        X = np.empty((len(model_idx), 8), dtype=np.float32)
+        for row, i in enumerate(model_idx):
+            X[row] = extract_features_from_domain(domains[i])
+        try:
+            batch_verdicts, batch_confidences, source = _classify_batch(X)
+        except Exception as e:
+            log(f"Model prediction error for batch of {len(model_idx)} domains: {e}")
+            batch_verdicts = ["UNKNOWN"] * len(model_idx)
+            batch_confidences = [0.0] * len(model_idx)
+            source = "error"
+        for row, i in enumerate(model_idx):
+            verdicts[i] = batch_verdicts[row]
+            confidences[i] = float(batch_confidences[row])
+            sources[i] = source
+
+    records = []
+    for i, domain in enumerate(domains):
+        records.append({
+            "domain": domain,
+            "verdict": verdicts[i],
+            "confidence": round(float(confidences[i]), 4),
+            "source": sources[i],
+            "timestamp": ts
+        })
+
+    with recent_lock:
+        for record in records:
+            recent_queries.append(record)
+        _queries_cache[0] = None
+    for record in records:
+        persist_query(record)
+    log(f"CHECK_BATCH: {len(domains)} domains => " +
+        ", ".join(f"{r['domain']}:{r['verdict']}" for r in records))
+
+    return _json_response({"verdicts": {r["domain"]: r["verdict"] for r in records},
+                           "results": records})
+
+@app.route("/api/queries", methods=["GET"])
+def api_queries():
+    with recent_lock:
+        # return recent queries newest-first; reserialize only after a change
+        buf = _queries_cache[0]
+        if buf is None:
+            buf = _dumps(list(reversed(recent_queries)))
+            _queries_cache[0] = buf
+    return Response(buf, mimetype="application/json")
+
+@app.route("/api/block", methods=["POST"])
+def api_block():
+    data = _get_json(request)
+    if not isinstance(data, dict) or "domain" not in data:
+        return _json_response({"error": "missing 'domain' in JSON"}, status=400)
+    domain = str(data["domain"]).strip().lower()
+    manual_block.add(domain)
+    _bloom_add(domain)
+    persist_blocked()
+    log(f"MANUAL BLOCK: {domain}")
+    return _json_response({"status": "ok", "domain": domain})
+
+@app.route("/api/unblock", methods=["POST"])
+def api_unblock():
+    data = _get_json(request)
+    if not isinstance(data, dict) or "domain" not in data:
+        return _json_response({"error": "missing 'domain' in JSON"}, status=400)
+    domain = str(data["domain"]).strip().lower()
+    if domain in manual_block:
+        manual_block.remove(domain)
+        _bloom_rebuild()
+        persist_blocked()
+        log(f"MANUAL UNBLOCK: {domain}")
+        return _json_response({"status": "ok", "domain": domain})
+    else:
+        return _json_response({"status": "not_found", "domain": domain}, status=404)
+
+# Simple health endpoint
+@app.route("/health", methods=["GET"])
+def health():
+    return _json_response({"status": "ok", "model_loaded": model is not None})
+
+# ---------------- Simple web dashboard (HTML + JS) ----------------
+DASH_HTML = """
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>Defender SOC Dashboard</title>
+  <style>
+    body {
+      background: url("/static/bg.png") no-repeat center center fixed;
+      background-size: cover;
+      font-family: Arial, sans-serif;
+      color: #fff;
+    }
+
+    /* Overlay to darken the background slightly */
+    body::before {
+      content: "";
+      position: fixed;
+      top: 0; left: 0; right: 0; bottom: 0;
+      background: rgba(0, 0, 0, 0.034); /* 75% dark overlay */
+      z-index: -1;
+    }
+
+
+    h1 {
+      font-size: 20px;
+      color: #fff;  /* bright white headings */
+    }
+
+    table {
+      border-collapse: collapse;
+      width: 100%;
+      margin-top: 12px;
+      background: rgba(197, 190, 190, 0);       /* dark gray table bg */
+      border-radius: 8px;
+      overflow: hidden;
+      box-shadow: 0 2px 8px rgba(0,0,0,0.6);
+    }
+
+    th, td {
+      /*border: 0px solid #ffffff;    subtle borders */
+      border: 4px solid #ffffff;
+      padding: 10px;
+      text-align: left;
+    }
+
+    th {
+      background: #ffffff;
+      color: #000000;
+      font-weight: 600;
+    }
+
+    .dga {
+      background-color:#8c29a0;  /* dark red background */
+      color: #ffffff;             /* neon red text */
+      
+    }
+
+    tr.notdga {
+      background-color: #289198;  /* dark green background */
+      color:   #ffffff;             /* neon green text */
+    }
+
+    .controls {
+      margin-top: 12px;
+      background: #ffffff;
+      padding: 12px;
+      border-radius: 8px;
+      box-shadow: 0 1px 6px rgba(0,0,0,0.4);
+    }
+
+    input[type="text"] {
+      padding: 8px;
+      background: #ffffff;
+      border: 2px solid #c433db;
+      border-radius: 10px;
+      color: #000000;
+    }
+
+    button {
+      padding: 8px 14px;
+      margin-right: 6px;
+      background: #c433db;       /* purple? idk */
+      border: none;
+      border-radius: 7px;
+      color: white;
+      font-weight: 600;
+      cursor: pointer;
+      transition: background 0.3s;
+    }
+
+    button:hover {
+      background: #ff0088;       /* lighter blue hover */
+    }
+
+    #status {
+      margin-left: 8px;
+      color: #000000;
+    }
+
+  </style>
+</head>
+<body>
+  <h1>Defender SOC Dashboard</h1>
+  <div>
+    <button onclick="refresh()">Refresh</button>
+    <span id="status">Loading...</span>
+  </div>
+
+  <div class="controls">
+    <input type="text" id="manualDomain" placeholder="domain.to.block">
+    <button onclick="manualBlock()">Block</button>
+    <button onclick="manualUnblock()">Unblock</button>
+  </div>
+
+  <table id="queriesTable">
+    <thead>
+      <tr><th>Time (UTC)</th><th>Domain</th><th>Verdict</th><th>Confidence</th><th>Source</th><th>Action</th></tr>
+    </thead>
+    <tbody></tbody>
+  </table>
+
+<script>
+async function api(path, method='GET', body=null){
+  const res = await fetch(path, {
+    method: method,
+    headers: {'Content-Type': 'application/json'},
+    body: body ? JSON.stringify(body) : null
+  });
+  return res.json();
+}
+
+
+
+async function refresh(){
+  document.getElementById('status').innerText = "Refreshing..."
+  try {
+    const data = await api('/api/queries');
+    const tbody = document.querySelector('#queriesTable tbody');
+    tbody.innerHTML = '';
+
+    for (let i = 0; i < data.length; i++) {
+      const q = data[i];
+      const tr = document.createElement('tr');
+      tr.className = q.verdict === 'DGA' ? 'dga' : (q.verdict === 'NOT_DGA' ? 'notdga' : '');
+
+      // Add the basic row cells
+      tr.innerHTML = `
+        <td>${q.timestamp}</td>
+        <td>${q.domain}</td>
+        <td>${q.verdict}</td>
+        <td>${q.confidence}</td>
+        <td>${q.source}</td>
+      `;
+
+      // Create Action button cell
+      const actionTd = document.createElement('td');
+      if (q.verdict.toUpperCase() === 'DGA') {
+        actionTd.innerHTML = `<button onclick="unblockDomain('${q.domain}')">Unblock</button>`;
+      } else {
+        actionTd.innerHTML = `<button onclick="blockDomain('${q.domain}')">Block</button>`;
+      }
+
+      // Add the action button cell to the row
+      tr.appendChild(actionTd);
+
+      // Add the row to the table body
+      tbody.appendChild(tr);
+    }
+
+    document.getElementById('status').innerText = "Updated " + new Date().toLocaleTimeString();
+  } catch (e) {
+    document.getElementById('status').innerText = "Error refreshing";
+    console.error(e);
+  }
+}
+
+async function blockDomain(domain){
+  await api('/api/block','POST',{domain:domain});
+  await refresh();
+}
+
+async function unblockDomain(domain){
+  await api('/api/unblock','POST',{domain:domain});
+  await refresh();
+}
+
+async function manualBlock(){
+  const input = document.getElementById('manualDomain');
+  const domain = input.value.trim();
+  if (!domain) return alert('Enter a domain');
+  await api('/api/block','POST',{domain:domain});
+  input.value = '';   // ✅ clear input
+  await refresh();
+}
+
+async function manualUnblock(){
+  const input = document.getElementById('manualDomain');
+  const domain = input.value.trim();
+  if (!domain) return alert('Enter a domain');
+  await api('/api/unblock','POST',{domain:domain});
+  input.value = '';   // ✅ clear input
+  await refresh();
+}
+
+// poll every 2 seconds
+refresh();
+setInterval(refresh, 2000);
+</script>
+</body>
+</html>
+"""
+
+@app.route("/")
+def dashboard():
+    return render_template_string(DASH_HTML)
+
+# ---------------- Startup ----------------
+if __name__ == "__main__":
+    log("Defender_v2 starting up...")
+    # try to train model now if not already
+    load_and_train(CSV_PATH)
+    # Ensure persisted blocked file exists
+    persist_blocked()
+    # start Flask
+    app.run(host="0.0.0.0", port=5000, debug=False)
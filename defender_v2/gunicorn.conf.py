@@ -0,0 +1,11 @@
+# gunicorn config for defender_v2.
+#
+# Single worker on purpose: recent_queries and manual_block live in process
+# memory, so multiple workers would each show/enforce a different view. The
+# gevent worker still handles many concurrent /check requests; bump workers
+# only after moving that state to shared storage.
+bind = "0.0.0.0:5000"
+workers = 1
+worker_class = "gevent"
+worker_connections = 1000
+keepalive = 5
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for defender_v2.
+
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+Model training and the persist-writer thread start at import time in
+defende_v2, so importing the app is all that is needed here.
+"""
+
+from defende_v2 import app
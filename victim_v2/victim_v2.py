@@ -1,211 +1,355 @@
-#!/usr/bin/env python3
-"""
-File name: victim_v2.py
-Author: abhijithsuren
-Description: Beginner-friendly victim_v2 script for DGA lab.
-
-Changes:
-- Uses a tld_list of 10 TLDs and appends them one-to-one to each generated DGA label.
-- Removed dga-lab.local usage.
-- If user types a domain without a TLD, '.com' is appended.
-"""
-
-import hashlib
-import base64
-import time
-import threading
-import requests
-import os
-import sys
-from datetime import datetime
-
-# ----------------- Configuration -----------------
-SEED = "spreadlove"        # the seed is clear as crystal #spreadlove #bekind <3
-SET_SIZE = 10              # domains per set (must match length of TLD_LIST)
-DELAY_SECONDS = 50          # wait between sets
-DEFENDER_URL = "http://defender_v2:5000/check"   # Defender_v2 REST endpoint
-ATTACKER_HOST = "attacker_v2" # hostname on Docker network; used when simulating a connection (Host header method)
-ATTACKER_PORT = 8080
-LOG_DIR = "/app/logs"
-LOG_FILE = os.path.join(LOG_DIR, "victim_v2.log")
-
-# new: list of TLDs to append, one-to-one for the 10 labels generated per set
-TLD_LIST = [".com", ".net", ".xyz", ".top", ".site",
-            ".online", ".club", ".tk", ".pw", ".cc"]
-# -------------------------------------------------
-
-# sanity check
-if len(TLD_LIST) < SET_SIZE:
-    raise ValueError("TLD_LIST must have at least SET_SIZE entries")
-
-# ensure log directory exists
-os.makedirs(LOG_DIR, exist_ok=True)
-
-# simple logger (append)
-def log(msg: str):
-    ts = datetime.utcnow().isoformat() + "Z"
-    line = f"[{ts}] {msg}"
-    #print(line)
-    with open(LOG_FILE, "a") as f:
-        f.write(line + "\n")
-
-# deterministic DGA generator:
-# combine SEED + timestamp_str + index -> sha256 -> base32 -> domain label
-def generate_domain_label(seed: str, timestamp_str: str, index: int, label_length: int = 12) -> str:
-    """
-    Create a deterministic domain label from (seed, timestamp_str, index).
-    Returns a string of length `label_length` containing lowercase letters and digits.
-    """
-    input_bytes = f"{seed}:{timestamp_str}:{index}".encode("utf-8")
-    digest = hashlib.sha256(input_bytes).digest()
-    # base32 (A-Z2-7), then make lowercase and remove '=' padding
-    b32 = base64.b32encode(digest).decode("utf-8").lower().replace("=", "")
-    # keep only letters and digits, cut to requested length
-    label = "".join(ch for ch in b32 if ch.isalnum())[:label_length]
-    # ensure label starts with a letter (makes it more domain-like)
-    if label and label[0].isdigit():
-        # replace first char with 'a'
-        label = "a" + label[1:]
-    return label
-
-def generate_set(seed: str, set_index: int, set_time: float) -> list:
-    """
-    Generate one set of domains (SET_SIZE) using timestamp-based period.
-    set_time: epoch seconds used in timestamp (float)
-    Returns list of fully qualified domains where each generated label is appended
-    with the corresponding element from TLD_LIST (one-to-one).
-    """
-    timestamp_str = datetime.utcfromtimestamp(set_time).strftime("%Y%m%d%H%M")
-    labels = []
-    i = 0
-    while len(labels) < SET_SIZE:
-        label = generate_domain_label(seed, timestamp_str, i)
-        if label not in labels:
-            labels.append(label)
-        i += 1
-
-    # append TLDs one-to-one: label 0 -> TLD_LIST[0], label 1 -> TLD_LIST[1], ...
-    domains = []
-    for idx, label in enumerate(labels):
-        tld = TLD_LIST[idx % len(TLD_LIST)]
-        domain = f"{label}{tld}"
-        domains.append(domain)
-    return domains
-
-def send_to_defender(domain: str, timeout=5) -> dict:
-    """
-    Send domain to defender_v2 and wait for response.
-    Returns a dictionary with default structure {"verdict":"UNKNOWN", "detail": "..."} on error.
-    Expected Defender_v2 response: {"verdict": "DGA"} or {"verdict":"NOT_DGA"}.
-    """
-    payload = {"domain": domain}
-    try:
-        resp = requests.post(DEFENDER_URL, json=payload, timeout=timeout)
-        resp.raise_for_status()
-        data = resp.json()
-        verdict = data.get("verdict", "UNKNOWN")
-        return {"verdict": verdict, "detail": data}
-    except requests.exceptions.RequestException as e:
-        log(f"ERROR: cannot contact Defender_v2 ({e}) for domain {domain}")
-        return {"verdict": "UNKNOWN", "detail": str(e)}
-    except ValueError:
-        log(f"ERROR: Defender_v2 returned non-JSON response for domain {domain}")
-        return {"verdict": "UNKNOWN", "detail": "Non-JSON response"}
-
-def simulate_connection(domain: str):
-    """
-    Simulate connecting to the domain if defender_v2 says NOT_DGA.
-    For lab simplicity we connect to the attacker_v2 container and set the Host header to the domain.
-    """
-    url = f"http://{ATTACKER_HOST}:{ATTACKER_PORT}/"
-    headers = {"Host": domain}
-    try:
-        r = requests.get(url, headers=headers, timeout=5)
-        log(f"Connection attempt to {domain} (via attacker_v2) returned status {r.status_code}, body: {r.text!r}")
-    except requests.exceptions.RequestException as e:
-        log(f"Connection attempt to {domain} failed: {e}")
-
-def handle_domain(domain: str):
-    """
-    Full victim_v2-side handling of one domain:
-    - log generated/requested domain
-    - send to defender_v2 and wait for verdict
-    - if verdict == NOT_DGA -> attempt simulated connection
-    - persist logs
-    """
-    log(f"Generated/Requested domain: {domain}")
-    resp = send_to_defender(domain)
-    verdict = resp.get("verdict", "UNKNOWN")
-    log(f"Defender_v2 verdict for {domain}: {verdict}  details={resp.get('detail')}")
-    # Act based on verdict
-    if verdict == "NOT_DGA":
-        log(f"VERDICT NOT_DGA: attempting connection to {domain}")
-        simulate_connection(domain)
-    elif verdict == "DGA":
-        log(f"VERDICT DGA: blocking {domain} (no connection)")
-    else:
-        # Unknown verdict (defender_v2 down or error) -> safe action: block / or retry
-        log(f"VERDICT UNKNOWN: default action = block {domain}")
-
-# Background thread that continuously generates DGA sets
-def dga_generation_loop(stop_event: threading.Event):
-    set_index = 0
-    while not stop_event.is_set():
-        set_time = time.time()
-        domains = generate_set(SEED, set_index, set_time)
-        log(f"--- DGA SET {set_index} (time={datetime.utcfromtimestamp(set_time).isoformat()}Z) ---")
-        for d in domains:
-            if stop_event.is_set():
-                break
-            handle_domain(d)
-        set_index += 1
-        # wait for the configured delay between sets
-        log(f"Set {set_index-1} complete. Sleeping for {DELAY_SECONDS} seconds before next set.")
-        total_sleep = 0.0
-        while total_sleep < DELAY_SECONDS and not stop_event.is_set():
-            time.sleep(0.5)
-            total_sleep += 0.5
-
-# Terminal input loop (main thread) for interactive user queries
-def interactive_input_loop(stop_event: threading.Event):
-    log("Interactive input ready. Type domain names and press Enter. Type 'exit' to quit.")
-    try:
-        while not stop_event.is_set():
-            user_input = input("Enter domain (or 'exit'): ").strip()
-            if user_input.lower() == "exit":
-                log("Exit requested by user.")
-                stop_event.set()
-                break
-            if user_input == "":
-                continue
-            # If user did not provide a TLD, append .com for interactive queries
-            domain = user_input if "." in user_input else f"{user_input}.com"
-            handle_domain(domain)
-    except (EOFError, KeyboardInterrupt):
-        log("Interactive input terminated (CTRL-C or EOF). Stopping.")
-        stop_event.set()
-
-def main():
-    log("Victim_v2 script starting.")
-    stop_event = threading.Event()
-
-    # start DGA generation in background thread
-    t = threading.Thread(target=dga_generation_loop, args=(stop_event,), daemon=True)
-    t.start()
-
-    # main thread handles interactive input
-    interactive_input_loop(stop_event)
-
-    # when interactive loop ends, signal background thread to stop and wait
-    stop_event.set()
-    log("Waiting for background DGA thread to finish...")
-    t.join(timeout=2.0)
-    log("Victim_v2 script exiting.")
-
-if __name__ == "__main__":
-    log("Starting victim_v2 container process.")
-    try:
-        main()
-    except Exception as e:
-        log(f"UNCAUGHT ERROR in victim_v2 process: {e}")
-        sys.exit(1)
+#!/usr/bin/env python3
+"""
+File name: victim_v2.py
+Author: abhijithsuren
+Description: Beginner-friendly victim_v2 script for DGA lab.
+
+Changes:
+- Uses a tld_list of 10 TLDs and appends them one-to-one to each generated DGA label.
+- Removed dga-lab.local usage.
+- If user types a domain without a TLD, '.com' is appended.
+"""
+
+import asyncio
+import atexit
+import hashlib
+import logging
+import logging.handlers
+import queue
+import socket
+import time
+import requests
+import os
+import sys
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx  # optional: HTTP/2 multiplexing toward defender_v2
+except ImportError:
+    httpx = None
+
+# ----------------- Configuration -----------------
+SEED = "spreadlove"        # the seed is clear as crystal #spreadlove #bekind <3
+SEED_BYTES = SEED.encode("utf-8")  # encoded once; generate_set builds its prefix in bytes
+SET_SIZE = 10              # domains per set (must match length of TLD_LIST)
+DELAY_SECONDS = 50          # wait between sets
+DEFENDER_HOST = "defender_v2" # hostname on Docker network
+DEFENDER_PORT = 5000
+ATTACKER_HOST = "attacker_v2" # hostname on Docker network; used when simulating a connection (Host header method)
+ATTACKER_PORT = 8080
+LOG_DIR = "/app/logs"
+LOG_FILE = os.path.join(LOG_DIR, "victim_v2.log")
+
+# new: list of TLDs to append, one-to-one for the 10 labels generated per set
+TLD_LIST = [".com", ".net", ".xyz", ".top", ".site",
+            ".online", ".club", ".tk", ".pw", ".cc"]
+# encoded once so generate_set can build label+tld in bytes with no per-set
+# re-encoding of the suffixes
+TLD_BYTES = tuple(tld.encode("ascii") for tld in TLD_LIST)
+# -------------------------------------------------
+
+# sanity check
+if len(TLD_LIST) < SET_SIZE:
+    raise ValueError("TLD_LIST must have at least SET_SIZE entries")
+
+def _resolve(hostname: str) -> str:
+    """Resolve a container hostname to its IP once at startup; connecting to
+    the literal skips a DNS round-trip on every pool refill. Falls back to
+    the hostname when resolution fails (e.g. running outside the lab network)."""
+    try:
+        return socket.gethostbyname(hostname)
+    except OSError:
+        return hostname
+
+# URLs target the resolved IPs; Host headers preserve the vhost semantics
+DEFENDER_URL = f"http://{_resolve(DEFENDER_HOST)}:{DEFENDER_PORT}/check"   # Defender_v2 REST endpoint
+DEFENDER_BATCH_URL = DEFENDER_URL + "_batch"  # batched variant (one POST per set)
+_DEFENDER_HEADERS = {"Host": DEFENDER_HOST}
+_ATTACKER_IP = _resolve(ATTACKER_HOST)
+
+# Shared HTTP session: urllib3 connection pooling + keep-alive mean the
+# sockets to defender_v2 and attacker_v2 get reused instead of paying a TCP
+# handshake (and possibly a DNS lookup) for every single domain.
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32,
+                                      max_retries=Retry(total=2, backoff_factor=0.1)))
+atexit.register(_SESSION.close)
+
+# Async HTTP/2 client for the event loop: requests is HTTP/1.1-only, so each
+# keep-alive connection serializes responses head-of-line; httpx with http2
+# multiplexes every in-flight check over one TCP connection. When httpx/h2
+# are not installed, blocking calls through the pooled requests session run
+# on worker threads via asyncio.to_thread instead.
+if httpx is not None:
+    _ACLIENT = httpx.AsyncClient(http2=True, timeout=5.0,
+                                 limits=httpx.Limits(max_keepalive_connections=8))
+    _HTTP_ERRORS = (requests.exceptions.RequestException, httpx.HTTPError)
+else:
+    _ACLIENT = None
+    _HTTP_ERRORS = (requests.exceptions.RequestException,)
+
+def _post_json_blocking(url: str, payload: dict, timeout) -> dict:
+    """Fallback POST through the requests session (run on a worker thread)."""
+    resp = _SESSION.post(url, json=payload, timeout=timeout, headers=_DEFENDER_HEADERS)
+    resp.raise_for_status()
+    return resp.json()
+
+async def _post_json(url: str, payload: dict, timeout) -> dict:
+    """POST payload to a defender_v2 endpoint and decode the JSON reply."""
+    if _ACLIENT is not None:
+        resp = await _ACLIENT.post(url, json=payload, timeout=timeout, headers=_DEFENDER_HEADERS)
+        resp.raise_for_status()
+        return resp.json()
+    return await asyncio.to_thread(_post_json_blocking, url, payload, timeout)
+
+# ensure log directory exists
+os.makedirs(LOG_DIR, exist_ok=True)
+
+# Asynchronous logging: handle_domain logs 3-4 lines per domain, and the old
+# log() paid an open/write/close per line. Callers now just enqueue a record;
+# a QueueListener thread drains the queue to a rotating file, so no disk I/O
+# happens on the DGA or interactive paths. The timestamp comes from the
+# formatter instead of a per-call datetime.utcnow().isoformat().
+_log_queue = queue.Queue(-1)
+_file_handler = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=10_000_000, backupCount=3)
+_log_formatter = logging.Formatter("[%(asctime)s] %(message)s", datefmt="%Y-%m-%dT%H:%M:%SZ")
+_log_formatter.converter = time.gmtime
+_file_handler.setFormatter(_log_formatter)
+_log_listener = logging.handlers.QueueListener(_log_queue, _file_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+_logger = logging.getLogger("victim_v2")
+_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_logger.setLevel(logging.INFO)
+
+def log(msg: str):
+    _logger.info(msg)
+
+# deterministic DGA generator:
+# combine SEED + timestamp_str + index -> sha256 -> base32 -> domain label
+#
+# The base32 step is a hand-rolled kernel: a 12-char label only consumes the
+# first 60 bits of the digest, so load 8 bytes as one int and pull out twelve
+# 5-bit alphabet indices with shifts. This skips base64.b32encode's full
+# 32-byte encode, the .lower() pass, and the slice, and emits lowercase
+# directly. Output is bit-for-bit identical to the b32encode path.
+_B32_ALPHABET = b"abcdefghijklmnopqrstuvwxyz234567"
+# 10-bit -> 2-char lookup table: one fancy-index per character pair, so a
+# 12-char label is six table hits and a join instead of twelve shift/mask
+# rounds. The table is 1024 two-byte entries built once at import.
+_B32_PAIRS = tuple(bytes((_B32_ALPHABET[i >> 5], _B32_ALPHABET[i & 31]))
+                   for i in range(1024))
+_B32_PAIR_SHIFTS = (50, 40, 30, 20, 10, 0)
+
+def _label_from_digest(digest: bytes, label_length: int = 12, tld: bytes = b"") -> str:
+    v = int.from_bytes(digest[:8], "big") >> 4  # top 60 bits
+    b32 = b"".join(_B32_PAIRS[(v >> shift) & 1023] for shift in _B32_PAIR_SHIFTS)
+    if label_length != 12:
+        b32 = b32[:label_length]
+    # ensure label starts with a letter (makes it more domain-like)
+    if b32[0:1].isdigit():
+        # replace first char with 'a'
+        b32 = b"a" + b32[1:]
+    # fuse the TLD while still in bytes so label+tld needs a single decode
+    return (b32 + tld).decode("ascii")
+
+def generate_domain_label(seed: str, timestamp_str: str, index: int, label_length: int = 12) -> str:
+    """
+    Create a deterministic domain label from (seed, timestamp_str, index).
+    Returns a string of length `label_length` containing lowercase letters and digits.
+    """
+    input_bytes = f"{seed}:{timestamp_str}:{index}".encode("utf-8")
+    return _label_from_digest(hashlib.sha256(input_bytes, usedforsecurity=False).digest(), label_length)
+
+def generate_set(seed: str, set_index: int, set_time: float) -> list:
+    """
+    Generate one set of domains (SET_SIZE) using timestamp-based period.
+    set_time: epoch seconds used in timestamp (float)
+    Returns list of fully qualified domains where each generated label is appended
+    with the corresponding element from TLD_LIST (one-to-one).
+    """
+    # time.strftime over a gmtime tuple gives the same minute bucket as the
+    # old datetime.utcfromtimestamp(...).strftime route without constructing
+    # a datetime object per set
+    timestamp = time.strftime("%Y%m%d%H%M", time.gmtime(set_time)).encode("ascii")
+    # hash the constant "seed:timestamp:" prefix once per set; each index only
+    # pays for a cheap hash-object .copy() plus the trailing index bytes, the
+    # same prepared-prefix trick attacker_v2 uses
+    seed_bytes = SEED_BYTES if seed == SEED else seed.encode("utf-8")
+    h0 = hashlib.sha256(seed_bytes + b":" + timestamp + b":", usedforsecurity=False)
+    # With 12-char base32 labels the per-set collision probability is ~0, so
+    # generate indices 0..SET_SIZE-1 directly instead of the old scan-and-retry
+    # dedup loop (a linear list scan per insertion, quadratic per set).
+    # TLDs attach one-to-one (label 0 -> TLD_LIST[0], ...) inside the label
+    # builder, so each domain is assembled in bytes and decoded exactly once.
+    domains = []
+    for i in range(SET_SIZE):
+        h = h0.copy()
+        h.update(b"%d" % i)
+        domains.append(_label_from_digest(h.digest(), tld=TLD_BYTES[i % len(TLD_BYTES)]))
+    return domains
+
+async def send_to_defender(domain: str, timeout=5) -> dict:
+    """
+    Send domain to defender_v2 and wait for response.
+    Returns a dictionary with default structure {"verdict":"UNKNOWN", "detail": "..."} on error.
+    Expected Defender_v2 response: {"verdict": "DGA"} or {"verdict":"NOT_DGA"}.
+    """
+    payload = {"domain": domain}
+    try:
+        data = await _post_json(DEFENDER_URL, payload, timeout)
+        verdict = data.get("verdict", "UNKNOWN")
+        return {"verdict": verdict, "detail": data}
+    except _HTTP_ERRORS as e:
+        log(f"ERROR: cannot contact Defender_v2 ({e}) for domain {domain}")
+        return {"verdict": "UNKNOWN", "detail": str(e)}
+    except ValueError:
+        log(f"ERROR: Defender_v2 returned non-JSON response for domain {domain}")
+        return {"verdict": "UNKNOWN", "detail": "Non-JSON response"}
+
+async def send_batch_to_defender(domains: list, timeout=5) -> dict:
+    """
+    Send a whole set of domains to defender_v2 in one POST /check_batch call,
+    replacing SET_SIZE separate HTTP round-trips with one.
+    Returns a {domain: verdict} dict; on error every domain maps to "UNKNOWN"
+    so callers take the safe block action.
+    """
+    payload = {"domains": domains}
+    try:
+        verdicts = (await _post_json(DEFENDER_BATCH_URL, payload, timeout)).get("verdicts", {})
+        return {d: verdicts.get(d, "UNKNOWN") for d in domains}
+    except _HTTP_ERRORS as e:
+        log(f"ERROR: cannot contact Defender_v2 ({e}) for batch of {len(domains)} domains")
+        return {d: "UNKNOWN" for d in domains}
+    except ValueError:
+        log("ERROR: Defender_v2 returned non-JSON response for batch check")
+        return {d: "UNKNOWN" for d in domains}
+
+async def simulate_connection(domain: str):
+    """
+    Simulate connecting to the domain if defender_v2 says NOT_DGA.
+    For lab simplicity we connect to the attacker_v2 container and set the Host header to the domain.
+    """
+    url = f"http://{_ATTACKER_IP}:{ATTACKER_PORT}/"
+    headers = {"Host": domain}
+    # HEAD is enough here: only the status code is logged, so skipping the
+    # response body saves bytes on the wire and render work in attacker_v2
+    try:
+        if _ACLIENT is not None:
+            r = await _ACLIENT.head(url, headers=headers, timeout=5)
+        else:
+            r = await asyncio.to_thread(_SESSION.head, url, headers=headers,
+                                        timeout=5, allow_redirects=False)
+        log(f"Connection attempt to {domain} (via attacker_v2) returned status {r.status_code}")
+    except _HTTP_ERRORS as e:
+        log(f"Connection attempt to {domain} failed: {e}")
+
+async def act_on_verdict(domain: str, verdict: str):
+    """
+    Act on a defender_v2 verdict for one domain:
+    - NOT_DGA -> attempt simulated connection
+    - DGA -> block (no connection)
+    - anything else (defender_v2 down or error) -> safe action: block
+    """
+    if verdict == "NOT_DGA":
+        log(f"VERDICT NOT_DGA: attempting connection to {domain}")
+        await simulate_connection(domain)
+    elif verdict == "DGA":
+        log(f"VERDICT DGA: blocking {domain} (no connection)")
+    else:
+        log(f"VERDICT UNKNOWN: default action = block {domain}")
+
+async def handle_domain(domain: str):
+    """
+    Full victim_v2-side handling of one domain (interactive path):
+    - log generated/requested domain
+    - send to defender_v2 and wait for verdict
+    - act on the verdict (connect / block)
+    """
+    log(f"Generated/Requested domain: {domain}")
+    resp = await send_to_defender(domain)
+    verdict = resp.get("verdict", "UNKNOWN")
+    log(f"Defender_v2 verdict for {domain}: {verdict}  details={resp.get('detail')}")
+    await act_on_verdict(domain, verdict)
+
+# Background task that continuously generates DGA sets. The whole loop is a
+# coroutine: the batch RPC and the per-domain connect/block actions all share
+# one event loop, so a full set's worth of I/O is in flight at once without a
+# worker thread per request.
+async def dga_generation_loop(stop_event: asyncio.Event):
+    set_index = 0
+    while not stop_event.is_set():
+        set_time = time.time()
+        domains = generate_set(SEED, set_index, set_time)
+        log(f"--- DGA SET {set_index} (time={time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(set_time))}Z) ---")
+        # one batched RPC for the whole set instead of SET_SIZE round-trips
+        verdicts = await send_batch_to_defender(domains)
+        log(f"Defender_v2 batch verdicts: {verdicts}")
+        if not stop_event.is_set():
+            # overlap the independent per-domain actions (connect/block)
+            await asyncio.gather(*(act_on_verdict(d, verdicts.get(d, "UNKNOWN"))
+                                   for d in domains))
+        set_index += 1
+        # wait for the configured delay between sets; returns immediately on shutdown
+        log(f"Set {set_index-1} complete. Sleeping for {DELAY_SECONDS} seconds before next set.")
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=DELAY_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+# Interactive user queries; blocking input() runs on a worker thread so the
+# event loop keeps servicing the DGA task while waiting for the terminal.
+async def interactive_input_loop(stop_event: asyncio.Event):
+    log("Interactive input ready. Type domain names and press Enter. Type 'exit' to quit.")
+    try:
+        while not stop_event.is_set():
+            user_input = (await asyncio.to_thread(input, "Enter domain (or 'exit'): ")).strip()
+            if user_input.lower() == "exit":
+                log("Exit requested by user.")
+                stop_event.set()
+                break
+            if user_input == "":
+                continue
+            # If user did not provide a TLD, append .com for interactive queries
+            # (rpartition scans once at C level and spares the f-string in the
+            # common dotted case)
+            domain = user_input if user_input.rpartition(".")[1] else user_input + ".com"
+            await handle_domain(domain)
+    except (EOFError, KeyboardInterrupt):
+        log("Interactive input terminated (CTRL-C or EOF). Stopping.")
+        stop_event.set()
+
+async def main_async():
+    log("Victim_v2 script starting.")
+    stop_event = asyncio.Event()
+
+    # start DGA generation as a background task on the same loop
+    dga_task = asyncio.create_task(dga_generation_loop(stop_event))
+
+    # handle interactive input until the user exits
+    await interactive_input_loop(stop_event)
+
+    # when interactive loop ends, signal the background task to stop and wait
+    stop_event.set()
+    log("Waiting for background DGA task to finish...")
+    try:
+        await asyncio.wait_for(dga_task, timeout=2.0)
+    except asyncio.TimeoutError:
+        dga_task.cancel()
+    if _ACLIENT is not None:
+        await _ACLIENT.aclose()
+    log("Victim_v2 script exiting.")
+
+def main():
+    asyncio.run(main_async())
+
+if __name__ == "__main__":
+    log("Starting victim_v2 container process.")
+    try:
+        main()
+    except KeyboardInterrupt:
+        log("Victim_v2 interrupted (CTRL-C). Stopping.")
+    except Exception as e:
+        log(f"UNCAUGHT ERROR in victim_v2 process: {e}")
+        sys.exit(1)